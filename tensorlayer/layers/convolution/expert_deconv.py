@@ -1,6 +1,9 @@
 #! /usr/bin/python
 # -*- coding: utf-8 -*-
 
+import inspect
+import os
+
 import tensorflow as tf
 
 import tensorlayer as tl
@@ -16,6 +19,78 @@ __all__ = [
     'DeConv3dLayer',
 ]
 
+_gpu_capability = None  # compute capability of the oldest visible GPU, () if there is none
+
+
+def _min_gpu_capability():
+    """Return the (major, minor) compute capability of the oldest GPU visible to TensorFlow, or () without GPU."""
+    global _gpu_capability
+    if _gpu_capability is None:
+        gpus = tf.config.experimental.list_physical_devices('GPU')
+        get_device_details = getattr(tf.config.experimental, 'get_device_details', None)
+        if not gpus:
+            _gpu_capability = ()
+        elif get_device_details is None:
+            _gpu_capability = (0, 0)
+        else:
+            _gpu_capability = min(get_device_details(gpu).get('compute_capability', (0, 0)) for gpu in gpus)
+    return _gpu_capability
+
+
+def _gpu_available():
+    """Return True if TensorFlow can see at least one GPU."""
+    return len(_min_gpu_capability()) > 0
+
+
+def _prefer_channels_last(dtype):
+    """Return True if transposed convolutions of ``dtype`` inputs are fastest in channels-last layout, i.e. on CPU
+    (Eigen / oneDNN), on GPUs with TF32 tensor cores (compute capability 8.0+), and for float16 / bfloat16 inputs on
+    GPUs with tensor cores (compute capability 7.0+). cuDNN runs other fp32 deconvolutions natively in NCHW."""
+    capability = _min_gpu_capability()
+    if not capability:
+        return True
+    if dtype in (tf.float16, tf.bfloat16):
+        return capability >= (7, 0)
+    return capability >= (8, 0)
+
+
+def _xla_disabled():
+    """Return True if the ``TL_DISABLE_XLA`` environment variable turns XLA compilation off."""
+    return os.environ.get('TL_DISABLE_XLA', '0').lower() not in ('', '0', 'false')
+
+
+def _jit_compile(fn):
+    """Compile ``fn`` with XLA on GPU so the deconvolution and bias are fused into as few kernels as possible.
+    On CPU ``fn`` is kept uncompiled, as XLA is much slower there than the stock kernels. Set the ``TL_DISABLE_XLA``
+    environment variable to ``1`` to keep ``fn`` uncompiled on GPU as well."""
+    if _xla_disabled() or not _gpu_available():
+        return fn
+    params = inspect.signature(tf.function).parameters
+    if 'jit_compile' in params:
+        return tf.function(fn, jit_compile=True)
+    if 'experimental_compile' in params:  # TF 2.1 - 2.4
+        return tf.function(fn, experimental_compile=True)
+    return fn
+
+
+def _to_channels_last(values):
+    """Permute a per-dimension tuple such as strides or dilations from channels-first to channels-last order."""
+    values = tuple(values)
+    return (values[0], ) + values[2:] + (values[1], )
+
+
+def _channels_last_config(data_format, outputs_shape, strides, dilation_rate):
+    """Return the ``(data_format, outputs_shape, strides, dilations)`` arguments of the channels-last transposed
+    convolution equivalent to the given one. Channels-last arguments are returned as they are."""
+    ndim = len(outputs_shape)
+    if data_format in ('NWC', 'NHWC', 'NDHWC'):
+        return data_format, tuple(outputs_shape), list(strides), list(dilation_rate)
+    if len(strides) == ndim:
+        strides = _to_channels_last(strides)
+    return 'NDHWC' if ndim == 5 else 'NHWC', _to_channels_last(outputs_shape), list(strides), list(
+        _to_channels_last(dilation_rate)
+    )
+
 
 class DeConv1dLayer(Layer):
     """A de-convolution 1D layer.
@@ -51,6 +126,8 @@ class DeConv1dLayer(Layer):
     - shape = [w, the number of output channels of this layer, the number of output channel of the previous layer].
     - outputs_shape = [batch_size, any, the number of output channels of this layer].
     - the number of output channel of a layer is its last dimension.
+    - On GPU, the deconvolution and bias are compiled with XLA, set the environment variable ``TL_DISABLE_XLA=1``
+      before creating the layer to turn this off. The activation runs outside of the compiled function.
 
     Examples
     --------
@@ -90,9 +167,12 @@ class DeConv1dLayer(Layer):
         self.W_init = W_init
         self.b_init = b_init
         self.in_channels = self.shape[-1]
+        self._repr_cache = None
 
         self.build(None)
         self._built = True
+        # keep the activation out of the compiled function, so that reassigning ``act`` takes effect
+        self._compiled_deconvolve = _jit_compile(self._deconvolve)
 
         logging.info(
             "DeConv1dLayer %s: shape: %s out_shape: %s strides: %s pad: %s act: %s" % (
@@ -102,6 +182,9 @@ class DeConv1dLayer(Layer):
         )
 
     def __repr__(self):
+        # the string only depends on attributes fixed at construction, except for name and act
+        if self._repr_cache is not None and self._repr_cache[0] == (self.name, self.act):
+            return self._repr_cache[1]
         actstr = self.act.__name__ if self.act is not None else 'No Activation'
         s = (
             '{classname}(in_channels={in_channels}, out_channels={n_filter}, kernel_size={filter_size}'
@@ -115,30 +198,39 @@ class DeConv1dLayer(Layer):
         if self.name is not None:
             s += ', name=\'{name}\''
         s += ')'
-        return s.format(
+        s = s.format(
             classname=self.__class__.__name__, n_filter=self.shape[-2], filter_size=self.shape[0], **self.__dict__
         )
+        self._repr_cache = ((self.name, self.act), s)
+        return s
 
     def build(self, inputs):
         self.W = self._get_weights("filters", shape=self.shape, init=self.W_init)
         if self.b_init:
             self.b = self._get_weights("biases", shape=(self.shape[-2]), init=self.b_init)
+        # convert once here instead of on every forward call
+        self._strides_list = list(self.strides)
+        self._dilations_list = list(self.dilation_rate)
 
     def forward(self, inputs):
+        outputs = self._compiled_deconvolve(inputs)
+        if self.act:
+            outputs = self.act(outputs)
+        return outputs
+
+    def _deconvolve(self, inputs):
         outputs = tf.nn.conv1d_transpose(
             input=inputs,
             filters=self.W,
             output_shape=self.outputs_shape,
-            strides=list(self.strides),
+            strides=self._strides_list,
             padding=self.padding,
             data_format=self.data_format,
-            dilations=list(self.dilation_rate),
+            dilations=self._dilations_list,
             name=self.name,
         )
         if self.b_init:
             outputs = tf.nn.bias_add(outputs, self.b, data_format=self.data_format, name='bias_add')
-        if self.act:
-            outputs = self.act(outputs)
         return outputs
 
 
@@ -162,6 +254,8 @@ class DeConv2dLayer(Layer):
         The padding algorithm type: "SAME" or "VALID".
     data_format : str
         "NHWC" or "NCHW", default is "NHWC".
+        On CPU and on GPUs with tensor cores, "NCHW" inputs are transposed to "NHWC" around the deconvolution,
+        as the channels-last kernels are much faster there.
     dilation_rate : tuple of int
         Filter up-sampling/input down-sampling rate.
     W_init : initializer
@@ -176,6 +270,8 @@ class DeConv2dLayer(Layer):
     - shape = [h, w, the number of output channels of this layer, the number of output channel of the previous layer].
     - outputs_shape = [batch_size, any, any, the number of output channels of this layer].
     - the number of output channel of a layer is its last dimension.
+    - On GPU, the deconvolution and bias are compiled with XLA, set the environment variable ``TL_DISABLE_XLA=1``
+      before creating the layer to turn this off. The activation runs outside of the compiled function.
 
     Examples
     --------
@@ -224,9 +320,15 @@ class DeConv2dLayer(Layer):
         self.W_init = W_init
         self.b_init = b_init
         self.in_channels = self.shape[-1]
+        self._repr_cache = None
+
+        # NCHW inputs run through the (much faster) channels-last kernels where those are available
+        self._channels_last_args = _channels_last_config(data_format, outputs_shape, strides, dilation_rate)
 
         self.build(None)
         self._built = True
+        # keep the activation out of the compiled function, so that reassigning ``act`` takes effect
+        self._compiled_deconvolve = _jit_compile(self._deconvolve)
 
         logging.info(
             "DeConv2dLayer %s: shape: %s out_shape: %s strides: %s pad: %s act: %s" % (
@@ -236,6 +338,9 @@ class DeConv2dLayer(Layer):
         )
 
     def __repr__(self):
+        # the string only depends on attributes fixed at construction, except for name and act
+        if self._repr_cache is not None and self._repr_cache[0] == (self.name, self.act):
+            return self._repr_cache[1]
         actstr = self.act.__name__ if self.act is not None else 'No Activation'
         s = (
             '{classname}(in_channels={in_channels}, out_channels={n_filter}, kernel_size={filter_size}'
@@ -249,31 +354,50 @@ class DeConv2dLayer(Layer):
         if self.name is not None:
             s += ', name=\'{name}\''
         s += ')'
-        return s.format(
+        s = s.format(
             classname=self.__class__.__name__, n_filter=self.shape[-2], filter_size=(self.shape[0], self.shape[1]),
             **self.__dict__
         )
+        self._repr_cache = ((self.name, self.act), s)
+        return s
 
     def build(self, inputs):
         self.W = self._get_weights("filters", shape=self.shape, init=self.W_init)
         if self.b_init:
             self.b = self._get_weights("biases", shape=(self.shape[-2]), init=self.b_init)
+        # convert once here instead of on every forward call
+        self._strides_list = list(self.strides)
+        self._dilations_list = list(self.dilation_rate)
 
     def forward(self, inputs):
+        outputs = self._compiled_deconvolve(inputs)
+        if self.act:
+            outputs = self.act(outputs)
+        return outputs
+
+    def _deconvolve(self, inputs):
+        transpose_inputs = self.data_format == 'NCHW' and _prefer_channels_last(inputs.dtype)
+        if transpose_inputs:
+            data_format, outputs_shape, strides, dilations = self._channels_last_args
+            inputs = tf.transpose(a=inputs, perm=[0, 2, 3, 1])
+        else:
+            data_format, outputs_shape, strides, dilations = (
+                self.data_format, self.outputs_shape, self._strides_list, self._dilations_list
+            )
         outputs = tf.nn.conv2d_transpose(
             input=inputs,
             filters=self.W,
-            output_shape=self.outputs_shape,
-            strides=self.strides,
+            output_shape=outputs_shape,
+            strides=strides,
             padding=self.padding,
-            data_format=self.data_format,
-            dilations=list(self.dilation_rate),
+            data_format=data_format,
+            dilations=dilations,
             name=self.name,
         )
         if self.b_init:
-            outputs = tf.nn.bias_add(outputs, self.b, data_format=self.data_format, name='bias_add')
-        if self.act:
-            outputs = self.act(outputs)
+            outputs = tf.nn.bias_add(outputs, self.b, data_format=data_format, name='bias_add')
+        if transpose_inputs:
+            outputs = tf.transpose(a=outputs, perm=[0, 3, 1, 2])
         return outputs
 
 
@@ -297,6 +421,8 @@ class DeConv3dLayer(Layer):
         The padding algorithm type: "SAME" or "VALID".
     data_format : str
         "NDHWC" or "NCDHW", default is "NDHWC".
+        On CPU and on GPUs with tensor cores, "NCDHW" inputs are transposed to "NDHWC" around the deconvolution,
+        as the channels-last kernels are much faster there.
     dilation_rate : tuple of int
         Filter up-sampling/input down-sampling rate.
     W_init : initializer
@@ -311,6 +437,8 @@ class DeConv3dLayer(Layer):
     - shape = [d, h, w, the number of output channels of this layer, the number of output channel of the previous layer].
     - outputs_shape = [batch_size, any, any, any, the number of output channels of this layer].
     - the number of output channel of a layer is its last dimension.
+    - On GPU, the deconvolution and bias are compiled with XLA, set the environment variable ``TL_DISABLE_XLA=1``
+      before creating the layer to turn this off. The activation runs outside of the compiled function.
 
     Examples
     --------
@@ -350,9 +478,15 @@ class DeConv3dLayer(Layer):
         self.W_init = W_init
         self.b_init = b_init
         self.in_channels = self.shape[-1]
+        self._repr_cache = None
+
+        # NCDHW inputs run through the (much faster) channels-last kernels where those are available
+        self._channels_last_args = _channels_last_config(data_format, outputs_shape, strides, dilation_rate)
 
         self.build(None)
         self._built = True
+        # keep the activation out of the compiled function, so that reassigning ``act`` takes effect
+        self._compiled_deconvolve = _jit_compile(self._deconvolve)
 
         logging.info(
             "DeConv3dLayer %s: shape: %s out_shape: %s strides: %s pad: %s act: %s" % (
@@ -362,6 +496,9 @@ class DeConv3dLayer(Layer):
         )
 
     def __repr__(self):
+        # the string only depends on attributes fixed at construction, except for name and act
+        if self._repr_cache is not None and self._repr_cache[0] == (self.name, self.act):
+            return self._repr_cache[1]
         actstr = self.act.__name__ if self.act is not None else 'No Activation'
         s = (
             '{classname}(in_channels={in_channels}, out_channels={n_filter}, kernel_size={filter_size}'
@@ -375,23 +512,42 @@ class DeConv3dLayer(Layer):
         if self.name is not None:
             s += ', name=\'{name}\''
         s += ')'
-        return s.format(
+        s = s.format(
             classname=self.__class__.__name__, n_filter=self.shape[-2],
             filter_size=(self.shape[0], self.shape[1], self.shape[2]), **self.__dict__
         )
+        self._repr_cache = ((self.name, self.act), s)
+        return s
 
     def build(self, inputs):
         self.W = self._get_weights("filters", shape=self.shape, init=self.W_init)
         if self.b_init:
             self.b = self._get_weights("biases", shape=(self.shape[-2]), init=self.b_init)
+        # convert once here instead of on every forward call
+        self._strides_list = list(self.strides)
+        self._dilations_list = list(self.dilation_rate)
 
     def forward(self, inputs):
+        outputs = self._compiled_deconvolve(inputs)
+        if self.act:
+            outputs = self.act(outputs)
+        return outputs
+
+    def _deconvolve(self, inputs):
+        transpose_inputs = self.data_format == 'NCDHW' and _prefer_channels_last(inputs.dtype)
+        if transpose_inputs:
+            data_format, outputs_shape, strides, dilations = self._channels_last_args
+            inputs = tf.transpose(a=inputs, perm=[0, 2, 3, 4, 1])
+        else:
+            data_format, outputs_shape, strides, dilations = (
+                self.data_format, self.outputs_shape, self._strides_list, self._dilations_list
+            )
         outputs = tf.nn.conv3d_transpose(
-            input=inputs, filters=self.W, output_shape=self.outputs_shape, strides=self.strides, padding=self.padding,
-            data_format=self.data_format, dilations=list(self.dilation_rate), name=self.name
+            input=inputs, filters=self.W, output_shape=outputs_shape, strides=strides, padding=self.padding,
+            data_format=data_format, dilations=dilations, name=self.name
         )
         if self.b_init:
-            outputs = tf.nn.bias_add(outputs, self.b, data_format=self.data_format, name='bias_add')
-        if self.act:
-            outputs = self.act(outputs)
+            outputs = tf.nn.bias_add(outputs, self.b, data_format=data_format, name='bias_add')
+        if transpose_inputs:
+            outputs = tf.transpose(a=outputs, perm=[0, 4, 1, 2, 3])
         return outputs
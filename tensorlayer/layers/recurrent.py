@@ -305,11 +305,11 @@ class RNN(Layer):
             if self.return_seq_2d:
                 # PTB tutorial: stack dense layer after that, or compute the cost from the output
                 # 2D Tensor [batch_size * n_steps, n_hidden]
-                outputs = tf.reshape(tf.concat(outputs, 1), [-1, self.cell.units])
+                outputs = tf.reshape(tf.stack(outputs, axis=1), [-1, self.cell.units])
             else:
                 # <akara>: stack more RNN layer after that
                 # 3D Tensor [batch_size, n_steps, n_hidden]
-                outputs = tf.reshape(tf.concat(outputs, 1), [-1, total_steps, self.cell.units])
+                outputs = tf.stack(outputs, axis=1)
 
         if self.return_last_state and sequence_length is None:
             return outputs, states
@@ -747,13 +747,13 @@ class BiRNN(Layer):
         if self.return_seq_2d:
             # PTB tutorial: stack dense layer after that, or compute the cost from the output
             # 2D Tensor [batch_size * n_steps, n_hidden]
-            fw_outputs = tf.reshape(tf.concat(fw_outputs, 1), [-1, self.fw_cell.units])
-            bw_outputs = tf.reshape(tf.concat(bw_outputs, 1), [-1, self.bw_cell.units])
+            fw_outputs = tf.reshape(tf.stack(fw_outputs, axis=1), [-1, self.fw_cell.units])
+            bw_outputs = tf.reshape(tf.stack(bw_outputs, axis=1), [-1, self.bw_cell.units])
         else:
             # <akara>: stack more RNN layer after that
             # 3D Tensor [batch_size, n_steps, n_hidden]
-            fw_outputs = tf.reshape(tf.concat(fw_outputs, 1), [-1, total_steps, self.fw_cell.units])
-            bw_outputs = tf.reshape(tf.concat(bw_outputs, 1), [-1, total_steps, self.bw_cell.units])
+            fw_outputs = tf.stack(fw_outputs, axis=1)
+            bw_outputs = tf.stack(bw_outputs, axis=1)
 
         outputs = tf.concat([fw_outputs, bw_outputs], -1)
 
@@ -1064,13 +1064,13 @@ class ConvLSTM(Layer):
                 if return_seq_2d:
                     # PTB tutorial: stack dense layer after that, or compute the cost from the output
                     # 4D Tensor [n_example, h, w, c]
-                    self.outputs = tf.reshape(tf.concat(outputs, 1), [-1, cell_shape[0] * cell_shape[1] * feature_map])
+                    self.outputs = tf.reshape(
+                        tf.stack(outputs, axis=1), [-1, cell_shape[0] * cell_shape[1] * feature_map]
+                    )
                 else:
                     # <akara>: stack more RNN layer after that
                     # 5D Tensor [n_example/n_steps, n_steps, h, w, c]
-                    self.outputs = tf.reshape(
-                        tf.concat(outputs, 1), [-1, n_steps, cell_shape[0], cell_shape[1], feature_map]
-                    )
+                    self.outputs = tf.stack(outputs, axis=1)
 
         self.final_state = state
 
@@ -3,7 +3,9 @@
 
 import os
 import unittest
+from unittest import mock
 
+import numpy as np
 import tensorflow as tf
 
 import tensorlayer as tl
@@ -329,6 +331,73 @@ class Layer_Convolution_2D_Test(CustomTestCase):
         self.assertEqual(len(self.n15._info[0].layer.all_weights), 5)
         self.assertEqual(self.n15.get_shape().as_list()[1:], [24, 24, 64])
 
+    def test_deconv2dlayer_disable_xla(self):
+        data = tf.random.normal([2, 10, 10, 32])
+        ni = Input([2, 10, 10, 32], name='input_xla')
+        # XLA is only used on GPU by default, force it here so that both paths are compared on CPU as well
+        with mock.patch('tensorlayer.layers.convolution.expert_deconv._gpu_available', return_value=True):
+            xla = tl.layers.DeConv2dLayer(
+                act=tf.nn.relu, shape=(3, 3, 16, 32), outputs_shape=(2, 20, 20, 16), strides=(1, 2, 2, 1),
+                name='deconv2dlayer_xla'
+            )
+        xla_model = Model(inputs=ni, outputs=xla(ni))
+        xla.b.assign(tf.random.normal([16]))
+
+        with mock.patch.dict(os.environ, {'TL_DISABLE_XLA': '1'}):
+            ni = Input([2, 10, 10, 32], name='input_no_xla')
+            no_xla = tl.layers.DeConv2dLayer(
+                act=tf.nn.relu, shape=(3, 3, 16, 32), outputs_shape=(2, 20, 20, 16), strides=(1, 2, 2, 1),
+                name='deconv2dlayer_no_xla'
+            )
+            no_xla_model = Model(inputs=ni, outputs=no_xla(ni))
+        no_xla.W.assign(xla.W)
+        no_xla.b.assign(xla.b)
+
+        self.assertEqual(no_xla._compiled_deconvolve, no_xla._deconvolve)
+        xla_out = xla_model(data, is_train=False)
+        no_xla_out = no_xla_model(data, is_train=False)
+        self.assertTrue(np.allclose(no_xla_out.numpy(), xla_out.numpy(), atol=1e-5))
+
+    def test_deconv2dlayer_reassign_act(self):
+        data = tf.random.normal([2, 10, 10, 32])
+        ni = Input([2, 10, 10, 32], name='input_act')
+        layer = tl.layers.DeConv2dLayer(
+            shape=(3, 3, 16, 32), outputs_shape=(2, 20, 20, 16), strides=(1, 2, 2, 1), name='deconv2dlayer_act'
+        )
+        model = Model(inputs=ni, outputs=layer(ni))
+
+        linear_out = model(data, is_train=False)
+        layer.act = tf.nn.relu
+        relu_out = model(data, is_train=False)
+        self.assertTrue(np.allclose(relu_out.numpy(), tf.nn.relu(linear_out).numpy()))
+        self.assertIn('relu', repr(layer))
+
+    def test_deconv2dlayer_nchw(self):
+        data = tf.random.normal([2, 10, 10, 32])
+        ni = Input([2, 10, 10, 32], name='input_nhwc')
+        nhwc = tl.layers.DeConv2dLayer(
+            act=tf.nn.relu, shape=(3, 3, 16, 32), outputs_shape=(2, 20, 20, 16), strides=(1, 2, 2, 1),
+            name='deconv2dlayer_nhwc'
+        )
+        nhwc_model = Model(inputs=ni, outputs=nhwc(ni))
+        nhwc.b.assign(tf.random.normal([16]))
+
+        ni = Input([2, 32, 10, 10], name='input_nchw')
+        nchw = tl.layers.DeConv2dLayer(
+            act=tf.nn.relu, shape=(3, 3, 16, 32), outputs_shape=(2, 16, 20, 20), strides=(1, 1, 2, 2),
+            data_format='NCHW', name='deconv2dlayer_nchw'
+        )
+        nchw_model = Model(inputs=ni, outputs=nchw(ni))
+        nchw.W.assign(nhwc.W)
+        nchw.b.assign(nhwc.b)
+
+        nhwc_out = nhwc_model(data, is_train=False)
+        nchw_out = nchw_model(tf.transpose(a=data, perm=[0, 3, 1, 2]), is_train=False)
+        self.assertEqual(nchw_out.get_shape().as_list(), [2, 16, 20, 20])
+        self.assertTrue(
+            np.allclose(tf.transpose(a=nchw_out, perm=[0, 2, 3, 1]).numpy(), nhwc_out.numpy(), atol=1e-5)
+        )
+
     # def test_layer_n8(self):
     #
     #     self.assertEqual(len(self.n8.all_layers), 9)
@@ -428,6 +497,31 @@ class Layer_Convolution_3D_Test(CustomTestCase):
         self.assertEqual(len(self.n4._info[0].layer.all_weights), 2)
         self.assertEqual(self.n4.get_shape().as_list()[1:], [14, 14, 14, 32])
 
+    def test_deconv3dlayer_ncdhw(self):
+        data = tf.random.normal([2, 5, 5, 5, 32])
+        ni = Input([2, 5, 5, 5, 32], name='input_ndhwc')
+        ndhwc = tl.layers.DeConv3dLayer(
+            act=tf.nn.relu, shape=(2, 2, 2, 16, 32), outputs_shape=(2, 10, 10, 10, 16), strides=(1, 2, 2, 2, 1),
+            name='deconv3dlayer_ndhwc'
+        )
+        ndhwc_model = Model(inputs=ni, outputs=ndhwc(ni))
+        ndhwc.b.assign(tf.random.normal([16]))
+
+        ni = Input([2, 32, 5, 5, 5], name='input_ncdhw')
+        ncdhw = tl.layers.DeConv3dLayer(
+            act=tf.nn.relu, shape=(2, 2, 2, 16, 32), outputs_shape=(2, 16, 10, 10, 10), strides=(1, 1, 2, 2, 2),
+            data_format='NCDHW', name='deconv3dlayer_ncdhw'
+        )
+        ncdhw_model = Model(inputs=ni, outputs=ncdhw(ni))
+        ncdhw.W.assign(ndhwc.W)
+        ncdhw.b.assign(ndhwc.b)
+
+        ndhwc_out = ndhwc_model(data, is_train=False)
+        ncdhw_out = ncdhw_model(tf.transpose(a=data, perm=[0, 4, 1, 2, 3]), is_train=False)
+        self.assertEqual(ncdhw_out.get_shape().as_list(), [2, 16, 10, 10, 10])
+        self.assertTrue(
+            np.allclose(tf.transpose(a=ncdhw_out, perm=[0, 2, 3, 4, 1]).numpy(), ndhwc_out.numpy(), atol=1e-5)
+        )
 
 # class Layer_DeformableConvolution_Test(CustomTestCase):
 #